@@ -67,6 +67,8 @@ CREATE TABLE IF NOT EXISTS action_log (
 CREATE INDEX IF NOT EXISTS idx_clients_email ON clients(email);
 CREATE INDEX IF NOT EXISTS idx_rentals_active ON rentals(end_time) WHERE end_time IS NULL;
 CREATE INDEX IF NOT EXISTS idx_inventory_status ON inventory(status);
+CREATE INDEX IF NOT EXISTS idx_rentals_client_start ON rentals(client_id, start_time DESC);
+CREATE INDEX IF NOT EXISTS idx_action_log_event_time ON action_log(event_time);
 
 
 CREATE OR REPLACE VIEW active_rentals_view AS
@@ -137,11 +139,23 @@ FOR EACH ROW EXECUTE FUNCTION update_inventory_status();
 
 REVOKE ALL ON ALL TABLES IN SCHEMA public FROM PUBLIC;
 
-CREATE ROLE rental_admin WITH LOGIN PASSWORD 'admin123';
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT FROM pg_roles WHERE rolname = 'rental_admin') THEN
+        CREATE ROLE rental_admin WITH LOGIN PASSWORD 'admin123';
+    END IF;
+END
+$$;
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO rental_admin;
 GRANT USAGE, SELECT ON ALL SEQUENCES IN SCHEMA public TO rental_admin;
 
-CREATE ROLE rental_client;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT FROM pg_roles WHERE rolname = 'rental_client') THEN
+        CREATE ROLE rental_client;
+    END IF;
+END
+$$;
 GRANT SELECT, INSERT ON rentals, payments TO rental_client;
 GRANT SELECT ON active_rentals_view TO rental_client;
 
@@ -14,6 +14,7 @@ from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import Config
 from database import Database
+from profiling import HandlerTrackingMiddleware, LoopLagMonitor, SamplingProfiler
 from queries import SQL
 from utils import (
     generate_rental_report,
@@ -38,6 +39,11 @@ bot = Bot(
 )
 dp = Dispatcher(storage=MemoryStorage())
 db = Database()
+lag_monitor = LoopLagMonitor()
+profiler = SamplingProfiler()
+
+dp.message.middleware(HandlerTrackingMiddleware())
+dp.callback_query.middleware(HandlerTrackingMiddleware())
 
 
 # Состояния FSM
@@ -293,16 +299,23 @@ async def on_startup():
     await db.connect()  # Подключаемся к БД
     logger.info("Database initialized")
     await cleanup_temp_files()
+    await lag_monitor.start()
+    profiler.install_signal_handler()  # kill -USR1 <pid> включает/выключает профайлер
 
 
 async def on_shutdown():
+    await lag_monitor.stop()
+    await profiler.close()
     await db.close()  # Закрываем соединения
     logger.info("Database connection closed")
 
 
 async def main():
     await on_startup()  # Явно вызываем on_startup
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await on_shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -13,5 +13,14 @@ class Config:
         "port": os.getenv("DB_PORT", 5432)
     }
 
+    # Отдельная БД для проверки планов запросов (пересоздается при каждом запуске)
+    PLAN_CHECK_DB_NAME = os.getenv("PLAN_CHECK_DB_NAME", "bd_plan_check")
+
+    # Профилирование event loop
+    LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", 100))
+    LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", 50))
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "temp/profiles")
+
     # Настройки безопасности
     SECRET_KEY = os.getenv("SECRET_KEY", "default-secret-key")
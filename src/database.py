@@ -2,7 +2,7 @@ import logging
 import asyncpg
 from asyncpg import Pool, Connection
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, BinaryIO
 import os
 
 from config import Config
@@ -109,6 +109,65 @@ class Database:
     async def get_active_rentals(self, user_id: int) -> List[Dict[str, Any]]:
         return await self.fetch(SQL.GET_ACTIVE_RENTALS, user_id)
 
+    async def bulk_update_inventory_status(self, inventory_ids: List[int], status: str,
+                                           user_id: Optional[int] = None) -> int:
+        """Смена статуса для набора пар одним запросом"""
+        if not inventory_ids:
+            return 0
+
+        async with self._pool.acquire() as conn:
+            try:
+                async with conn.transaction():
+                    result = await conn.execute(
+                        SQL.BULK_UPDATE_INVENTORY_STATUS,
+                        inventory_ids,
+                        status
+                    )
+                    updated = int(result.split()[-1])
+                    if updated:
+                        await conn.execute(
+                            SQL.LOG_ACTION,
+                            user_id,
+                            'bulk_status',
+                            f"Inventory count: {updated}, Status: {status}"
+                        )
+                logger.info(f"🛠 Статус '{status}' установлен для {updated} пар")
+                return updated
+            except asyncpg.PostgresError as e:
+                logger.error(f"🚨 Ошибка массового обновления статуса: {e}")
+                raise
+
+    async def import_inventory_csv(self, source: Union[str, Path, BinaryIO],
+                                   user_id: Optional[int] = None) -> int:
+        """Приемка поставки из CSV (brand, model_name, type, size, quantity)"""
+        async with self._pool.acquire() as conn:
+            try:
+                async with conn.transaction():
+                    await conn.execute(SQL.CREATE_INVENTORY_STAGING)
+                    await conn.copy_to_table(
+                        'inventory_staging',
+                        source=source,
+                        columns=['brand', 'model_name', 'type', 'size', 'quantity'],
+                        format='csv',
+                        header=True
+                    )
+                    await conn.execute(SQL.UPSERT_SKATE_MODELS_FROM_STAGING)
+                    await conn.execute(SQL.UPSERT_SIZES_FROM_STAGING)
+                    result = await conn.execute(SQL.INSERT_INVENTORY_FROM_STAGING)
+                    inserted = int(result.split()[-1])
+                    if inserted:
+                        await conn.execute(
+                            SQL.LOG_ACTION,
+                            user_id,
+                            'inventory_import',
+                            f"Inventory count: {inserted}"
+                        )
+                logger.info(f"📦 Принято на склад {inserted} пар")
+                return inserted
+            except asyncpg.PostgresError as e:
+                logger.error(f"🚨 Ошибка приемки инвентаря: {e}")
+                raise
+
     async def fetchval(self, query: str, *args) -> Any:
         async with self._pool.acquire() as conn:
             try:
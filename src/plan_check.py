@@ -0,0 +1,408 @@
+"""Регрессионная проверка планов запросов из queries.SQL.
+
+Скрипт пересоздает отдельную БД (Config.PLAN_CHECK_DB_NAME), применяет
+sql/ddl.sql, заполняет таблицы синтетическими данными и для каждой
+константы SQL выполняет EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON).
+Проверяются использование ожидаемых индексов, отсутствие Seq Scan по
+большим таблицам и верхние границы по буферам и времени выполнения.
+
+Запуск из каталога src:
+    python plan_check.py           # проверка
+    python plan_check.py --save    # сохранить прошедшие проверку планы как эталон
+
+При расхождении выводится diff между эталонным (sql/plans/*.txt) и
+фактическим планом.
+"""
+import argparse
+import asyncio
+import difflib
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import asyncpg
+
+from config import Config
+from queries import SQL
+
+logger = logging.getLogger(__name__)
+
+SQL_DIR = Path(__file__).resolve().parent.parent / "sql"
+PLANS_DIR = SQL_DIR / "plans"
+
+# Объем синтетических данных
+DATASET = {
+    "skate_models": 50,
+    "clients": 20000,
+    "inventory": 20000,
+    "rentals": 200000,
+    "action_log": 200000,
+}
+
+SEED_SQL = f"""
+    SELECT setseed(0.42);
+
+    INSERT INTO skate_models (brand, model_name, type)
+    SELECT
+        (ARRAY['Bauer', 'CCM', 'Riedell', 'Jackson'])[1 + g % 4],
+        'Model ' || g,
+        (ARRAY['hockey', 'figure', 'speed'])[1 + g % 3]
+    FROM generate_series(1, {DATASET["skate_models"]}) g;
+
+    INSERT INTO sizes (skate_model_id, size)
+    SELECT sm.id, sz
+    FROM skate_models sm
+    CROSS JOIN generate_series(25, 50) sz;
+
+    INSERT INTO inventory (size_id, status, last_maintenance)
+    SELECT
+        1 + (random() * (SELECT COUNT(*) - 1 FROM sizes))::INT,
+        CASE WHEN random() < 0.05 THEN 'repair'
+             WHEN random() < 0.2 THEN 'rented'
+             ELSE 'available' END,
+        CASE WHEN random() < 0.5 THEN CURRENT_DATE - (random() * 365)::INT END
+    FROM generate_series(1, {DATASET["inventory"]});
+
+    INSERT INTO clients (telegram_id, name, phone, email, hashed_password)
+    SELECT
+        100000000 + g,
+        'Client ' || g,
+        '+7' || LPAD(g::TEXT, 10, '0'),
+        'client' || g || '@example.com',
+        'hash'
+    FROM generate_series(1, {DATASET["clients"]}) g;
+
+    ALTER TABLE rentals DISABLE TRIGGER trg_rentals_inventory;
+
+    INSERT INTO rentals (client_id, inventory_id, start_time, end_time, total_cost)
+    SELECT
+        1 + (random() * ({DATASET["clients"]} - 1))::INT,
+        1 + (random() * ({DATASET["inventory"]} - 1))::INT,
+        t.start_time,
+        CASE WHEN random() < 0.01 THEN NULL
+             ELSE t.start_time + (1 + random() * 5) * INTERVAL '1 hour' END,
+        (random() * 50)::NUMERIC(10,2)
+    FROM (
+        SELECT CURRENT_TIMESTAMP - random() * INTERVAL '730 days' AS start_time
+        FROM generate_series(1, {DATASET["rentals"]})
+    ) t;
+
+    ALTER TABLE rentals ENABLE TRIGGER trg_rentals_inventory;
+
+    INSERT INTO payments (rental_id, amount, payment_time, payment_method)
+    SELECT id, total_cost + 1, end_time, (ARRAY['cash', 'card', 'online'])[1 + id % 3]
+    FROM rentals
+    WHERE end_time IS NOT NULL;
+
+    INSERT INTO action_log (event_time, user_id, action_type, details)
+    SELECT
+        CURRENT_TIMESTAMP - (g::FLOAT / {DATASET["action_log"]}) * INTERVAL '31 days',
+        1 + (random() * ({DATASET["clients"]} - 1))::INT,
+        'INSERT',
+        'Synthetic event ' || g
+    FROM generate_series(1, {DATASET["action_log"]}) g;
+
+    ANALYZE;
+"""
+
+
+class Expectation(NamedTuple):
+    params: Tuple[Any, ...] = ()
+    indexes: Tuple[str, ...] = ()
+    no_seq_scan: Tuple[str, ...] = ()
+    max_buffers: int = 100
+    max_ms: float = 50.0
+    setup: str = ""
+
+
+# Запросы, для которых EXPLAIN неприменим (DDL)
+NOT_EXPLAINABLE = {"CREATE_INVENTORY_STAGING"}
+
+STAGING_SETUP = SQL.CREATE_INVENTORY_STAGING + """;
+    INSERT INTO inventory_staging (brand, model_name, type, size, quantity)
+    SELECT 'Bauer', 'Model ' || g, 'hockey', 25 + g % 26, 1 + g % 5
+    FROM generate_series(1, 100) g;
+    ANALYZE inventory_staging;
+"""
+
+# Шаги приемки идут в том же порядке, что и в Database.import_inventory_csv,
+# чтобы новые модели из поставки доходили до sizes и inventory
+STAGING_MODELS_SETUP = STAGING_SETUP + SQL.UPSERT_SKATE_MODELS_FROM_STAGING + ";"
+STAGING_SIZES_SETUP = STAGING_MODELS_SETUP + SQL.UPSERT_SIZES_FROM_STAGING + ";"
+
+# Ожидания для каждой константы SQL. Запросы на изменение данных
+# выполняются в транзакции, которая откатывается; setup выполняется
+# в той же транзакции перед EXPLAIN. Границы по буферам (shared + local,
+# то есть вместе с временной inventory_staging) сняты замером на
+# PostgreSQL 16 (число буферов на этих данных детерминировано) с запасом
+# ~25%; границы по времени заданы с запасом на шум.
+EXPECTATIONS: Dict[str, Expectation] = {
+    "GET_USER_BY_TG_ID": Expectation(
+        params=(100000042,),
+        indexes=("clients_telegram_id_key",),
+        no_seq_scan=("clients",),
+        max_buffers=10,
+    ),
+    "REGISTER_USER": Expectation(
+        params=(1, "plan@example.com", "+79990000000", "hash", "Plan Check"),
+        max_buffers=20,
+    ),
+    "GET_USER_BY_EMAIL": Expectation(
+        params=("client42@example.com",),
+        no_seq_scan=("clients",),
+        max_buffers=10,
+    ),
+    "UPDATE_USER_PROFILE": Expectation(
+        params=(42, "Renamed", None),
+        indexes=("clients_pkey",),
+        no_seq_scan=("clients",),
+        max_buffers=30,
+    ),
+    "CREATE_RENTAL": Expectation(
+        params=(42, 42, 5),
+        max_buffers=50,
+    ),
+    "COMPLETE_RENTAL": Expectation(
+        params=(42,),
+        indexes=("rentals_pkey",),
+        no_seq_scan=("rentals",),
+        max_buffers=75,
+    ),
+    "GET_ACTIVE_RENTALS": Expectation(
+        params=(42,),
+        indexes=("idx_rentals_client_start",),
+        no_seq_scan=("rentals", "inventory"),
+        max_buffers=25,
+    ),
+    "GET_AVAILABLE_SIZES": Expectation(
+        max_buffers=200,
+        max_ms=100.0,
+    ),
+    "GET_INVENTORY_DETAILS": Expectation(
+        params=(40,),
+        max_buffers=200,
+        max_ms=100.0,
+    ),
+    "UPDATE_INVENTORY_STATUS": Expectation(
+        params=(42, "repair"),
+        indexes=("inventory_pkey",),
+        no_seq_scan=("inventory",),
+        max_buffers=20,
+    ),
+    "BULK_UPDATE_INVENTORY_STATUS": Expectation(
+        params=(list(range(1, 201)), "repair"),
+        indexes=("inventory_pkey",),
+        no_seq_scan=("inventory",),
+        max_buffers=2800,
+    ),
+    "UPSERT_SKATE_MODELS_FROM_STAGING": Expectation(
+        setup=STAGING_SETUP,
+        max_buffers=570,
+    ),
+    "UPSERT_SIZES_FROM_STAGING": Expectation(
+        setup=STAGING_MODELS_SETUP,
+        max_buffers=820,
+    ),
+    "INSERT_INVENTORY_FROM_STAGING": Expectation(
+        setup=STAGING_SIZES_SETUP,
+        max_buffers=2280,
+    ),
+    "GET_RENTAL_HISTORY": Expectation(
+        params=(42,),
+        indexes=("idx_rentals_client_start",),
+        no_seq_scan=("rentals", "inventory"),
+        max_buffers=110,
+    ),
+    "GET_POPULAR_SIZES": Expectation(
+        max_buffers=2800,
+        max_ms=1000.0,
+    ),
+    "GET_FINANCIAL_REPORT": Expectation(
+        max_buffers=1900,
+        max_ms=1000.0,
+    ),
+    "LOG_ACTION": Expectation(
+        params=(42, "plan_check", "details"),
+        max_buffers=10,
+    ),
+    "CLEANUP_OLD_LOGS": Expectation(
+        indexes=("idx_action_log_event_time",),
+        no_seq_scan=("action_log",),
+        max_buffers=8200,
+    ),
+}
+
+
+def sql_constants() -> Dict[str, str]:
+    return {
+        name: value
+        for name, value in vars(SQL).items()
+        if name.isupper() and isinstance(value, str) and name not in NOT_EXPLAINABLE
+    }
+
+
+def walk_plan(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [node]
+    for child in node.get("Plans", []):
+        nodes.extend(walk_plan(child))
+    return nodes
+
+
+def render_plan(node: Dict[str, Any], depth: int = 0) -> List[str]:
+    """Текстовое представление формы плана (без стоимостей и таймингов)"""
+    line = node["Node Type"]
+    if "Index Name" in node:
+        line += f" using {node['Index Name']}"
+    if "Relation Name" in node:
+        line += f" on {node['Relation Name']}"
+    lines = ["  " * depth + line]
+    for child in node.get("Plans", []):
+        lines.extend(render_plan(child, depth + 1))
+    return lines
+
+
+def check_plan(result: Dict[str, Any], expected: Expectation) -> List[str]:
+    plan = result["Plan"]
+    nodes = walk_plan(plan)
+    errors = []
+
+    used_indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+    for index in expected.indexes:
+        if index not in used_indexes:
+            errors.append(f"не используется индекс {index}")
+
+    for node in nodes:
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in expected.no_seq_scan:
+            errors.append(f"Seq Scan по таблице {node['Relation Name']}")
+
+    # Local * Blocks — чтения временных таблиц (inventory_staging)
+    buffers = sum(
+        plan.get(key, 0)
+        for key in ("Shared Hit Blocks", "Shared Read Blocks", "Local Hit Blocks", "Local Read Blocks")
+    )
+    if buffers > expected.max_buffers:
+        errors.append(f"буферов {buffers} > {expected.max_buffers}")
+
+    elapsed = result.get("Execution Time", 0.0)
+    if elapsed > expected.max_ms:
+        errors.append(f"время {elapsed:.2f} мс > {expected.max_ms:.2f} мс")
+
+    return errors
+
+
+def load_baseline(name: str) -> Optional[List[str]]:
+    baseline_path = PLANS_DIR / f"{name}.txt"
+    if not baseline_path.exists():
+        return None
+    return baseline_path.read_text().splitlines()
+
+
+def plan_diff(name: str, actual: List[str]) -> str:
+    baseline = load_baseline(name)
+    if baseline is None:
+        return "\n".join(["Эталон не сохранен, фактический план:"] + actual)
+
+    return "\n".join(difflib.unified_diff(
+        baseline, actual,
+        fromfile=f"эталон/{name}", tofile=f"факт/{name}",
+        lineterm=""
+    ))
+
+
+async def recreate_database() -> asyncpg.Connection:
+    db_name = Config.PLAN_CHECK_DB_NAME
+    # Служебная БД postgres есть всегда, даже если БД приложения не создана
+    admin = await asyncpg.connect(**{**Config.DB_CONFIG, "database": "postgres"})
+    try:
+        await admin.execute(f'DROP DATABASE IF EXISTS "{db_name}"')
+        await admin.execute(f'CREATE DATABASE "{db_name}"')
+    finally:
+        await admin.close()
+
+    conn = await asyncpg.connect(**{**Config.DB_CONFIG, "database": db_name})
+    try:
+        await conn.execute((SQL_DIR / "ddl.sql").read_text())
+        await conn.execute(SEED_SQL)
+    except Exception:
+        await conn.close()
+        raise
+    logger.info(f"📦 Синтетические данные загружены в {db_name}")
+    return conn
+
+
+async def explain(conn: asyncpg.Connection, query: str, expected: Expectation) -> Dict[str, Any]:
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        if expected.setup:
+            await conn.execute(expected.setup)
+        result = await conn.fetchval(
+            f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", *expected.params
+        )
+    finally:
+        await transaction.rollback()
+
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+async def run(save: bool) -> int:
+    queries = sql_constants()
+    missing = sorted(set(queries) - set(EXPECTATIONS))
+    if missing:
+        logger.error(f"❌ Нет ожиданий для запросов: {', '.join(missing)}")
+        return 1
+
+    conn = await recreate_database()
+    failed = 0
+    try:
+        for name, query in queries.items():
+            expected = EXPECTATIONS[name]
+            try:
+                result = await explain(conn, query, expected)
+            except asyncpg.PostgresError as e:
+                failed += 1
+                logger.error(f"❌ {name}: ошибка выполнения: {e}")
+                continue
+
+            shape = render_plan(result["Plan"])
+            errors = check_plan(result, expected)
+            if errors:
+                failed += 1
+                logger.error(
+                    f"❌ {name}: {'; '.join(errors)}\n{plan_diff(name, shape)}"
+                )
+                continue
+
+            if save:
+                # Эталоном становится только план, прошедший проверки
+                PLANS_DIR.mkdir(parents=True, exist_ok=True)
+                (PLANS_DIR / f"{name}.txt").write_text("\n".join(shape) + "\n")
+            elif load_baseline(name) not in (None, shape):
+                logger.warning(f"⚠️ {name}: план изменился\n{plan_diff(name, shape)}")
+            logger.info(f"✅ {name}")
+    finally:
+        await conn.close()
+
+    logger.info(f"Проверено запросов: {len(queries)}, с ошибками: {failed}")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Проверка планов запросов SQL")
+    parser.add_argument("--save", action="store_true",
+                        help="сохранить текущие планы как эталон в sql/plans")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    sys.exit(asyncio.run(run(args.save)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Мониторинг задержек event loop и сэмплирующий профайлер.
+
+LoopLagMonitor измеряет лаг цикла событий и при превышении порога
+логирует стек блокирующего кадра вместе с активным хэндлером aiogram
+и типом апдейта. SamplingProfiler по сигналу SIGUSR1 включается или
+выключается и сохраняет стеки в формате collapsed stacks
+(flamegraph.pl, speedscope).
+"""
+import asyncio
+import itertools
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Активные хэндлеры: задача asyncio -> (имя хэндлера, тип апдейта)
+_active_handlers: Dict[asyncio.Task, Tuple[str, str]] = {}
+
+
+def _describe_handler(event: TelegramObject, data: Dict[str, Any]) -> Tuple[str, str]:
+    """Имя хэндлера и тип апдейта; профилирование не должно ронять хэндлер"""
+    try:
+        handler_object = data.get("handler")
+        callback = handler_object.callback if handler_object else None
+        name = getattr(callback, "__qualname__", repr(callback)) if callback else "unknown"
+        update = data.get("event_update")
+        update_type = update.event_type if update else type(event).__name__
+        return name, update_type
+    except Exception:
+        return "unknown", type(event).__name__
+
+
+class HandlerTrackingMiddleware(BaseMiddleware):
+    """Запоминает, какой хэндлер выполняется в текущей задаче"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        task = asyncio.current_task()
+        _active_handlers[task] = _describe_handler(event, data)
+        try:
+            return await handler(event, data)
+        finally:
+            _active_handlers.pop(task, None)
+
+
+def _describe_loop_task(loop: asyncio.AbstractEventLoop) -> str:
+    task = asyncio.current_task(loop)
+    if task is None:
+        return "вне задачи"
+    # Одно чтение: цикл событий может снять запись между проверкой и доступом
+    active = _active_handlers.get(task)
+    if active is None:
+        return f"задача {task.get_name()}"
+    name, update_type = active
+    return f"хэндлер {name}, апдейт {update_type}"
+
+
+def _thread_stack(thread_id: int) -> Optional[Any]:
+    return sys._current_frames().get(thread_id)
+
+
+class LoopLagMonitor:
+    """Сторож лага event loop.
+
+    Корутина в цикле событий обновляет отметку времени каждые
+    interval секунд, а отдельный поток проверяет ее. Если отметка не
+    обновлялась дольше порога, поток снимает стек цикла событий,
+    пока тот еще заблокирован.
+    """
+
+    def __init__(self, threshold_ms: float = Config.LOOP_LAG_THRESHOLD_MS,
+                 interval_ms: float = Config.LOOP_LAG_INTERVAL_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self._heartbeat = time.monotonic()
+        self._reported = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"⏱ Мониторинг лага event loop запущен (порог {self.threshold * 1000:.0f} мс)")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join)
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - expected
+            if self._reported:
+                # Сторож снял стек в начале блокировки, здесь — итоговая длительность
+                logger.warning(f"🧱 Блокировка event loop закончилась через {lag * 1000:.0f} мс")
+            elif lag > self.threshold:
+                logger.warning(f"🐢 Лаг event loop: {lag * 1000:.0f} мс")
+            self._heartbeat = time.monotonic()
+            self._reported = False
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked <= self.threshold or self._reported:
+                continue
+
+            frame = _thread_stack(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            self._reported = True
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                f"🧱 Event loop заблокирован уже {blocked * 1000:.0f} мс "
+                f"({_describe_loop_task(self._loop)})\n{stack}"
+            )
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер потока event loop.
+
+    Сэмплы собирает и записывает в файл отдельный поток, поэтому
+    остановка из обработчика сигнала не блокирует цикл событий.
+    """
+
+    def __init__(self, interval_ms: float = Config.PROFILE_INTERVAL_MS,
+                 output_dir: Union[str, Path] = Config.PROFILE_DIR):
+        self.interval = interval_ms / 1000
+        self.output_dir = Path(output_dir)
+        self._stop: Optional[threading.Event] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._runs = itertools.count(1)
+
+    @property
+    def running(self) -> bool:
+        return self._stop is not None and not self._stop.is_set()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample,
+            args=(threading.get_ident(), self._stop, next(self._runs)),
+            name="sampling-profiler",
+            daemon=True
+        )
+        self._sampler.start()
+        logger.info("🔬 Сэмплирующий профайлер запущен")
+
+    def stop(self) -> None:
+        """Останавливает сэмплирование; профиль сохраняет поток профайлера"""
+        if self.running:
+            self._stop.set()
+
+    async def close(self) -> None:
+        """Остановка с ожиданием записи профиля (при завершении бота)"""
+        self.stop()
+        if self._sampler:
+            await asyncio.to_thread(self._sampler.join)
+
+    def toggle(self) -> None:
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def install_signal_handler(self, sig: int = getattr(signal, "SIGUSR1", 0)) -> None:
+        """Переключение профайлера по сигналу (kill -USR1 <pid>)"""
+        if not sig:
+            logger.warning("Сигнал для профайлера недоступен на этой платформе")
+            return
+        asyncio.get_running_loop().add_signal_handler(sig, self.toggle)
+
+    def _dump(self, samples: Counter, run: int) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Номер запуска и pid делают имя уникальным, даже если запуски закончились в одну секунду
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = self.output_dir / f"profile_{timestamp}_{os.getpid()}_{run}.folded"
+        lines = [f"{stack} {count}" for stack, count in samples.most_common()]
+        filename.write_text("\n".join(lines) + "\n")
+        logger.info(f"🔬 Профиль сохранен: {filename} ({sum(samples.values())} сэмплов)")
+        return filename
+
+    def _sample(self, thread_id: int, stop: threading.Event, run: int) -> None:
+        samples: Counter = Counter()
+        while not stop.wait(self.interval):
+            frame = _thread_stack(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            samples[";".join(reversed(stack))] += 1
+        self._dump(samples, run)
@@ -11,8 +11,8 @@ class SQL:
         """
 
     REGISTER_USER = """
-        INSERT INTO clients (name, email, phone, hashed_password) 
-        VALUES ($1, $2, $3, $4)
+        INSERT INTO clients (telegram_id, email, phone, hashed_password, name) 
+        VALUES ($1, $2, $3, $4, $5)
         RETURNING id
     """
 
@@ -47,10 +47,14 @@ class SQL:
     """
 
     GET_ACTIVE_RENTALS = """
-            SELECT * 
-            FROM rentals 
-            WHERE is_active = TRUE
-        """
+        SELECT r.*, sm.brand, s.size
+        FROM rentals r
+        JOIN inventory i ON r.inventory_id = i.id
+        JOIN sizes s ON i.size_id = s.id
+        JOIN skate_models sm ON s.skate_model_id = sm.id
+        WHERE r.client_id = $1 AND r.end_time IS NULL
+        ORDER BY r.start_time DESC
+    """
 
     # =============================================
     # Запросы для работы с инвентарем
@@ -73,11 +77,54 @@ class SQL:
 
     UPDATE_INVENTORY_STATUS = """
         UPDATE inventory SET
-            status = $2,
-            last_maintenance = CASE WHEN $2 = 'repair' THEN NOW() ELSE last_maintenance END
+            status = $2::VARCHAR,
+            last_maintenance = CASE WHEN $2::VARCHAR = 'repair' THEN NOW() ELSE last_maintenance END
         WHERE id = $1
     """
 
+    BULK_UPDATE_INVENTORY_STATUS = """
+        UPDATE inventory i SET
+            status = $2::VARCHAR,
+            last_maintenance = CASE WHEN $2::VARCHAR = 'repair' THEN NOW() ELSE i.last_maintenance END
+        WHERE i.id = ANY($1::INT[])
+    """
+
+    # Приемка инвентаря из CSV: COPY во временную таблицу + upsert
+    CREATE_INVENTORY_STAGING = """
+        CREATE TEMP TABLE inventory_staging (
+            brand VARCHAR(50) NOT NULL,
+            model_name VARCHAR(50) NOT NULL,
+            type VARCHAR(20) NOT NULL,
+            size INT NOT NULL,
+            quantity INT NOT NULL CHECK (quantity > 0)
+        ) ON COMMIT DROP
+    """
+
+    UPSERT_SKATE_MODELS_FROM_STAGING = """
+        INSERT INTO skate_models (brand, model_name, type)
+        SELECT DISTINCT ON (model_name) brand, model_name, type
+        FROM inventory_staging
+        ORDER BY model_name
+        ON CONFLICT (model_name) DO NOTHING
+    """
+
+    UPSERT_SIZES_FROM_STAGING = """
+        INSERT INTO sizes (skate_model_id, size)
+        SELECT DISTINCT sm.id, st.size
+        FROM inventory_staging st
+        JOIN skate_models sm ON sm.model_name = st.model_name
+        ON CONFLICT (skate_model_id, size) DO NOTHING
+    """
+
+    INSERT_INVENTORY_FROM_STAGING = """
+        INSERT INTO inventory (size_id)
+        SELECT s.id
+        FROM inventory_staging st
+        JOIN skate_models sm ON sm.model_name = st.model_name
+        JOIN sizes s ON s.skate_model_id = sm.id AND s.size = st.size
+        CROSS JOIN generate_series(1, st.quantity)
+    """
+
     # =============================================
     # Отчеты и аналитика
     # =============================================